@@ -1,24 +1,30 @@
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from src.pdf_processor import PDFProcessor
 from src.heading_detector import HeadingDetector
 
+try:
+    import orjson  # C serializer, several times faster than stdlib json
+except ImportError:
+    orjson = None
+
+# Both processors are stateless, so one instance per worker process is enough
+_PDF = PDFProcessor()
+_HD = HeadingDetector()
+
 def process_single_pdf(input_path: str, output_path: str):
     """Process a single PDF file"""
     try:
-        # Initialize processors
-        pdf_processor = PDFProcessor()
-        heading_detector = HeadingDetector()
-        
         # Extract text with font information
-        text_blocks = pdf_processor.extract_text_with_fonts(input_path)
-        
+        text_blocks = _PDF.extract_text_with_fonts(input_path)
+
         # Detect title
-        title = pdf_processor.detect_title(text_blocks)
-        
+        title = _PDF.detect_title(text_blocks)
+
         # Detect headings
-        headings = heading_detector.detect_headings(text_blocks)
+        headings = _HD.detect_headings(text_blocks)
         
         # Create output JSON
         output_data = {
@@ -26,27 +32,44 @@ def process_single_pdf(input_path: str, output_path: str):
             "outline": headings
         }
         
-        # Write to output file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        # Write to output file (orjson emits UTF-8 bytes directly)
+        if orjson is not None:
+            Path(output_path).write_bytes(
+                orjson.dumps(output_data, option=orjson.OPT_INDENT_2)
+            )
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(output_data, f, indent=2, ensure_ascii=False)
         
         print(f"Successfully processed: {input_path}")
         
     except Exception as e:
         print(f"Error processing {input_path}: {str(e)}")
 
+def _worker(paths):
+    """Process one (input, output) path pair in a worker process"""
+    input_path, output_path = paths
+    process_single_pdf(input_path, output_path)
+
 def main():
     """Main function to process all PDFs in input directory"""
     input_dir = Path("input")
     output_dir = Path("output")
-    
+
     # Create output directory if it doesn't exist
     output_dir.mkdir(exist_ok=True)
-    
-    # Process all PDF files
-    for pdf_file in input_dir.glob("*.pdf"):
-        output_file = output_dir / f"{pdf_file.stem}.json"
-        process_single_pdf(str(pdf_file), str(output_file))
+
+    # Fan PDF files out across worker processes (PyMuPDF is C-bound per file,
+    # so processes sidestep the GIL where threads would not)
+    pdfs = [
+        (str(pdf_file), str(output_dir / f"{pdf_file.stem}.json"))
+        for pdf_file in input_dir.glob("*.pdf")
+    ]
+    if not pdfs:
+        return
+
+    with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4)) as executor:
+        list(executor.map(_worker, pdfs))
 
 if __name__ == "__main__":
     main()
@@ -1,178 +1,158 @@
 import re
+import sys
 from typing import List, Dict
 
+import numpy as np
+
+from src.pdf_processor import TextBlocks
+
+# All heading patterns merged into one alternation so a block is scanned once;
+# the named group that fired tells us which pattern (and heading level) matched.
+# Numbered branches go most-specific first so "1.1.1" isn't claimed by "1.".
+_HEADING_RE = re.compile(
+    r'^(?:(?P<h3>\d+\.\d+\.\d+\s+)'  # 1.1.1 1.1.2
+    r'|(?P<h2>\d+\.\d+\s+)'  # 1.1 1.2
+    r'|(?P<h1>\d+\.\s+)'  # 1. 2. 3.
+    r'|(?P<caps>[A-Z][A-Z\s]+$)'  # ALL CAPS
+    r'|(?P<chap>Chapter\s+\d+)'  # Chapter 1, Chapter 2
+    r'|(?P<sec>Section\s+\d+))'  # Section 1, Section 2
+)
+
+# Heading level per matched branch; non-numbered branches default to H2
+_GROUP_TO_LEVEL = {"h1": "H1", "h2": "H2", "h3": "H3", "caps": "H2", "chap": "H2", "sec": "H2"}
+
+# Numbering prefixes stripped by clean_heading_text, most specific first
+_CLEAN_PATTERNS = [
+    re.compile(r'^\d+\.\d+\.\d+\s*'),
+    re.compile(r'^\d+\.\d+\s*'),
+    re.compile(r'^\d+\.\s*'),
+]
+
 class HeadingDetector:
-    def __init__(self):
-        self.heading_patterns = [
-            r'^\d+\.\s+',  # 1. 2. 3.
-            r'^\d+\.\d+\s+',  # 1.1 1.2
-            r'^\d+\.\d+\.\d+\s+',  # 1.1.1 1.1.2
-            r'^[A-Z][A-Z\s]+$',  # ALL CAPS
-            r'^Chapter\s+\d+',  # Chapter 1, Chapter 2
-            r'^Section\s+\d+',  # Section 1, Section 2
-        ]
     
-    def analyze_font_hierarchy(self, text_blocks: List[Dict]) -> Dict[float, str]:
+    def analyze_font_hierarchy(self, text_blocks: TextBlocks) -> Dict[float, str]:
         """Analyze font sizes to determine heading levels"""
-        font_sizes = {}
-        for block in text_blocks:
-            size = block["font_size"]
-            if size not in font_sizes:
-                font_sizes[size] = []
-            font_sizes[size].append(block["text"])
-        
-        # Sort font sizes in descending order
-        sorted_sizes = sorted(font_sizes.keys(), reverse=True)
-        
-        # Map font sizes to heading levels with better logic
-        size_to_level = {}
-        
-        # Skip the largest font size (likely title)
-        if len(sorted_sizes) > 0:
-            # Second largest font size is usually H1
-            if len(sorted_sizes) > 1:
-                size_to_level[sorted_sizes[1]] = "H1"
-            
-            # Third largest font size is usually H2
-            if len(sorted_sizes) > 2:
-                size_to_level[sorted_sizes[2]] = "H2"
-            
-            # Fourth largest font size is usually H3
-            if len(sorted_sizes) > 3:
-                size_to_level[sorted_sizes[3]] = "H3"
-            
-            # Fifth largest font size is usually H4
-            if len(sorted_sizes) > 4:
-                size_to_level[sorted_sizes[4]] = "H4"
-        
-        return size_to_level
+        # Distinct font sizes in descending order (np.unique sorts ascending)
+        sorted_sizes = np.unique(text_blocks.sizes)[::-1]
+
+        # Skip the largest font size (likely title); the next four map to H1-H4
+        return {
+            float(size): level
+            for size, level in zip(sorted_sizes[1:5], ("H1", "H2", "H3", "H4"))
+        }
     
-    def detect_headings(self, text_blocks: List[Dict]) -> List[Dict]:
+    def detect_headings(self, text_blocks: TextBlocks) -> List[Dict]:
         """Detect headings based on font size and patterns"""
         size_to_level = self.analyze_font_hierarchy(text_blocks)
         headings = []
-        
-        # Group text blocks by font size and proximity
-        grouped_blocks = self.group_related_text_blocks(text_blocks)
-        
-        for group in grouped_blocks:
+        seen = set()
+
+        texts = text_blocks.texts
+        sizes = text_blocks.sizes
+        pages = text_blocks.pages
+
+        # Group text block rows by font size and proximity
+        grouped_rows = self.group_related_text_blocks(text_blocks)
+
+        for group in grouped_rows:
             if not group:
                 continue
-                
-            # Combine text from the group
-            combined_text = " ".join([block["text"].strip() for block in group if block["text"].strip()])
-            font_size = group[0]["font_size"]
-            page = group[0]["page"]
-            
+
+            # Combine text from the group (strip each block once)
+            stripped = [t for t in (texts[row].strip() for row in group) if t]
+            combined_text = " ".join(stripped)
+
+            # Cheap numeric disqualifiers come first so body paragraphs never
+            # reach the dict probe or the regex engine.
             # Skip empty, very short text, or text that's too long to be a heading
-            if len(combined_text) < 3 or len(combined_text) > 200:
+            text_len = len(combined_text)
+            if text_len < 3 or text_len > 200:
                 continue
-            
-            # Skip text that looks like body text (contains too many words)
-            if len(combined_text.split()) > 15:
+
+            # Skip text that looks like body text (contains too many words);
+            # counting separators avoids allocating a word list via .split()
+            if combined_text.count(' ') >= 15:
                 continue
+
+            font_size = float(sizes[group[0]])
+            page = int(pages[group[0]])
             
             # Check if font size indicates heading
             if font_size in size_to_level:
                 level = size_to_level[font_size]
-                if level in ["H1", "H2", "H3"]:
-                    headings.append({
-                        "level": level,
-                        "text": self.clean_heading_text(combined_text),
-                        "page": page
-                    })
-            
-            # Check pattern-based detection
-            elif self.matches_heading_pattern(combined_text):
-                level = self.determine_level_from_pattern(combined_text)
+                if level not in ["H1", "H2", "H3"]:
+                    continue
+            # Check pattern-based detection (single scan, level from matched branch)
+            else:
+                match = _HEADING_RE.match(combined_text)
+                if not match:
+                    continue
+                level = _GROUP_TO_LEVEL[match.lastgroup]
+
+            # Deduplicate as we go instead of in a second pass; interning lets
+            # repeated page headers compare by pointer in the seen set
+            text = sys.intern(self.clean_heading_text(combined_text))
+            key = (text, page)
+            if key not in seen:
+                seen.add(key)
                 headings.append({
                     "level": level,
-                    "text": self.clean_heading_text(combined_text),
+                    "text": text,
                     "page": page
                 })
-        
-        return self.deduplicate_headings(headings)
-    
-    def matches_heading_pattern(self, text: str) -> bool:
-        """Check if text matches common heading patterns"""
-        for pattern in self.heading_patterns:
-            if re.match(pattern, text):
-                return True
-        return False
-    
-    def determine_level_from_pattern(self, text: str) -> str:
-        """Determine heading level based on numbering pattern"""
-        if re.match(r'^\d+\.\d+\.\d+\s+', text):
-            return "H3"
-        elif re.match(r'^\d+\.\d+\s+', text):
-            return "H2"
-        elif re.match(r'^\d+\.\s+', text):
-            return "H1"
-        else:
-            return "H2"  # Default
-    
+
+        return headings
+
     def clean_heading_text(self, text: str) -> str:
         """Clean heading text by removing numbering"""
         # Remove common numbering patterns
-        text = re.sub(r'^\d+\.\d+\.\d+\s*', '', text)
-        text = re.sub(r'^\d+\.\d+\s*', '', text)
-        text = re.sub(r'^\d+\.\s*', '', text)
+        for pattern in _CLEAN_PATTERNS:
+            text = pattern.sub('', text)
         return text.strip()
     
-    def group_related_text_blocks(self, text_blocks: List[Dict]) -> List[List[Dict]]:
-        """Group text blocks that are likely part of the same heading or sentence"""
-        if not text_blocks:
+    def group_related_text_blocks(self, text_blocks: TextBlocks) -> List[List[int]]:
+        """Group row indices of blocks that are likely part of the same heading or sentence"""
+        if not len(text_blocks):
             return []
-        
-        # Sort blocks by page and vertical position
-        sorted_blocks = sorted(text_blocks, key=lambda x: (x["page"], x["bbox"][1], x["bbox"][0]))
-        
+
+        texts = text_blocks.texts
+        sizes = text_blocks.sizes
+        pages = text_blocks.pages
+        bboxes = text_blocks.bboxes
+
+        # Sort rows by page and vertical position (lexsort keys go least significant first)
+        order = np.lexsort((bboxes[:, 0], bboxes[:, 1], pages))
+        s_pages = pages[order]
+        s_sizes = sizes[order]
+        s_bboxes = bboxes[order]
+
+        # Compare each row against its predecessor in one vectorized pass:
+        # same page, same font size (small tolerance), close vertical position
+        # (within 10 points), and not too far horizontally (within 100 points)
+        joined = (
+            (s_pages[1:] == s_pages[:-1])
+            & (np.abs(s_sizes[1:] - s_sizes[:-1]) < 0.5)
+            & (np.abs(s_bboxes[1:, 1] - s_bboxes[:-1, 1]) < 10)
+            & (np.abs(s_bboxes[1:, 0] - s_bboxes[:-1, 0]) < 100)
+        )
+
+        # Split runs at every position where a condition failed, then enforce
+        # the combined-text length cap (too long is likely not a heading) in a
+        # cheap Python post-pass — it rarely triggers
         groups = []
-        current_group = []
-        
-        for i, block in enumerate(sorted_blocks):
-            if not current_group:
-                current_group = [block]
-                continue
-            
-            prev_block = current_group[-1]
-            
-            # Check if blocks should be grouped together
-            should_group = (
-                # Same page
-                block["page"] == prev_block["page"] and
-                # Same font size (within small tolerance)
-                abs(block["font_size"] - prev_block["font_size"]) < 0.5 and
-                # Close vertical position (within 10 points)
-                abs(block["bbox"][1] - prev_block["bbox"][1]) < 10 and
-                # Not too far horizontally (within 100 points for more conservative grouping)
-                abs(block["bbox"][0] - prev_block["bbox"][0]) < 100 and
-                # Don't group if the combined text would be too long (likely not a heading)
-                len(" ".join([b["text"] for b in current_group] + [block["text"]])) < 80
-            )
-            
-            if should_group:
-                current_group.append(block)
-            else:
-                if current_group:
+        for run in np.split(order, np.flatnonzero(~joined) + 1):
+            current_group = []
+            joined_len = 0
+            for row in run.tolist():
+                text_len = len(texts[row])
+                if current_group and joined_len + 1 + text_len >= 80:
                     groups.append(current_group)
-                current_group = [block]
-        
-        # Add the last group
-        if current_group:
-            groups.append(current_group)
-        
+                    current_group = [row]
+                    joined_len = text_len
+                else:
+                    joined_len = joined_len + 1 + text_len if current_group else text_len
+                    current_group.append(row)
+            if current_group:
+                groups.append(current_group)
+
         return groups
-    
-    def deduplicate_headings(self, headings: List[Dict]) -> List[Dict]:
-        """Remove duplicate headings"""
-        seen = set()
-        unique_headings = []
-        
-        for heading in headings:
-            key = (heading["text"], heading["page"])
-            if key not in seen:
-                seen.add(key)
-                unique_headings.append(heading)
-        
-        return unique_headings